@@ -0,0 +1,129 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.versions import bump_version, get_version
+
+UserModel = get_user_model()
+
+TOKEN_CACHE_KEY = 'auth-token:{}'
+USER_VERSION_NAME = 'auth-user:{}'
+
+
+class LocalTokenCache:
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def set(self, key, snapshot):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SharedTokenCache:
+
+    def __init__(self, alias, ttl):
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def make_key(self, key):
+        return TOKEN_CACHE_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, key):
+        return self.cache.get(self.make_key(key))
+
+    def set(self, key, snapshot):
+        self.cache.set(self.make_key(key), snapshot, self.ttl)
+
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+
+def build_token_cache():
+    options = settings.TOKEN_AUTH_CACHE
+    if options['BACKEND'] == 'cache':
+        return SharedTokenCache(options['CACHE_ALIAS'], options['TTL'])
+    return LocalTokenCache(options['MAX_SIZE'], options['TTL'])
+
+
+token_cache = build_token_cache()
+
+
+SNAPSHOT_FIELDS = tuple(
+    field.attname for field in UserModel._meta.concrete_fields
+    if field.attname != 'password'
+)
+
+
+def make_snapshot(user):
+    return tuple(getattr(user, attname) for attname in SNAPSHOT_FIELDS)
+
+
+def restore_snapshot(snapshot):
+    return UserModel.from_db('default', SNAPSHOT_FIELDS, snapshot)
+
+
+def get_user_version_name(user_id):
+    return USER_VERSION_NAME.format(user_id)
+
+
+def invalidate_token(key, user_id):
+    token_cache.delete(key)
+    bump_version(get_user_version_name(user_id))
+
+
+def invalidate_user(user_id):
+    bump_version(get_user_version_name(user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is not None:
+            user_id, version, snapshot = entry
+            if version == get_version(get_user_version_name(user_id)):
+                user = restore_snapshot(snapshot)
+                if not user.is_active:
+                    token_cache.delete(key)
+                    raise exceptions.AuthenticationFailed(
+                        _('User inactive or deleted.')
+                    )
+                return user, Token(key=key, user=user)
+            token_cache.delete(key)
+
+        user, token = super().authenticate_credentials(key)
+        version = get_version(get_user_version_name(user.pk))
+        token_cache.set(key, (user.pk, version, make_snapshot(user)))
+        return user, token
@@ -0,0 +1,76 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+
+    def __init__(self, srcset=False, **kwargs):
+        self.srcset = srcset
+        super().__init__(**kwargs)
+
+    def get_url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def to_representation(self, value):
+        if self.srcset:
+            return {
+                extension: ', '.join(
+                    f'{self.get_url(name)} {width}w'
+                    for width, name in widths.items()
+                )
+                for extension, widths in value.items()
+            }
+        return {
+            extension: {
+                width: self.get_url(name) for width, name in widths.items()
+            }
+            for extension, widths in value.items()
+        }
+
+
+def resolve_pks(queryset, pks):
+    instances = queryset.in_bulk(pks)
+    missing = [pk for pk in dict.fromkeys(pks) if pk not in instances]
+    if missing:
+        raise serializers.ValidationError(
+            'Недопустимые первичные ключи {} - объекты не существуют.'.format(
+                ', '.join(f'"{pk}"' for pk in missing)
+            )
+        )
+    return instances
+
+
+class BulkPrimaryKeyRelatedField(serializers.ListField):
+
+    def __init__(self, queryset, **kwargs):
+        self.queryset = queryset
+        kwargs.setdefault('child', serializers.IntegerField())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        pks = super().to_internal_value(data)
+        instances = resolve_pks(self.queryset.all(), pks)
+        return [instances[pk] for pk in pks]
+
+    def to_representation(self, value):
+        return [instance.pk for instance in value.all()]
+
+
+class BulkRelatedListSerializer(serializers.ListSerializer):
+
+    related_field = None
+    queryset = None
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        instances = resolve_pks(
+            self.queryset.all(),
+            [item[self.related_field] for item in items]
+        )
+        for item in items:
+            item[self.related_field] = instances[item[self.related_field]]
+        return items
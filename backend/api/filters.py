@@ -1,9 +1,22 @@
 import django_filters
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F
+from django.db.models.expressions import RawSQL
 from recipes.models import Ingredient, Recipe, Tag
 
 UserModel = get_user_model()
 
+SQLITE_MATCH_SQL = (
+    'SELECT rowid FROM recipes_recipe_fts '
+    'WHERE recipes_recipe_fts MATCH %s'
+)
+SQLITE_RANK_SQL = (
+    'SELECT -bm25(recipes_recipe_fts, 10.0, 1.0) FROM recipes_recipe_fts '
+    'WHERE recipes_recipe_fts MATCH %s AND rowid = recipes_recipe.id'
+)
+
 
 class IngredientFilter(django_filters.FilterSet):
 
@@ -29,6 +42,34 @@ class RecipeFilter(django_filters.FilterSet):
         queryset=UserModel.objects.all()
     )
 
+    search = django_filters.CharFilter(
+        method='filter_search'
+    )
+
     class Meta:
         model = Recipe
-        fields = ('tags', 'author')
+        fields = ('tags', 'author', 'search')
+
+    def filter_search(self, queryset, name, value):
+
+        if connections[queryset.db].vendor == 'postgresql':
+            query = SearchQuery(
+                value,
+                config='russian',
+                search_type='websearch'
+            )
+            return queryset.filter(
+                search_vector=query
+            ).annotate(
+                rank=SearchRank(F('search_vector'), query)
+            ).order_by('-rank', '-id')
+
+        query = ' '.join(
+            '"{}"*'.format(word.replace('"', '""'))
+            for word in value.split()
+        )
+        return queryset.filter(
+            pk__in=RawSQL(SQLITE_MATCH_SQL, (query,))
+        ).annotate(
+            rank=RawSQL(SQLITE_RANK_SQL, (query,))
+        ).order_by('-rank', '-id')
@@ -0,0 +1,62 @@
+import threading
+from bisect import bisect_left
+
+from api.versions import get_version
+from recipes.models import Ingredient
+
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = (None, [], [])
+
+    def _load(self):
+        version = get_version('ingredients')
+        if self._state[0] == version:
+            return self._state
+
+        with self._lock:
+            if self._state[0] != version:
+                rows = sorted(
+                    (name.casefold(), pk, name, measurement_unit)
+                    for pk, name, measurement_unit
+                    in Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit'
+                    ).iterator()
+                )
+                self._state = (
+                    version,
+                    [row[0] for row in rows],
+                    [
+                        {
+                            'id': pk,
+                            'name': name,
+                            'measurement_unit': measurement_unit,
+                        }
+                        for _, pk, name, measurement_unit in rows
+                    ],
+                )
+        return self._state
+
+    def search(self, query, limit):
+        _, keys, items = self._load()
+        prefix = query.casefold()
+
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + PREFIX_UPPER_BOUND, lo=start)
+        result = items[start:min(end, start + limit)]
+
+        if len(result) < limit:
+            for index, key in enumerate(keys):
+                if start <= index < end or prefix not in key:
+                    continue
+                result.append(items[index])
+                if len(result) == limit:
+                    break
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,231 @@
+import json
+import logging
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (CaptureQueriesContext,
+                               setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.fake_data import FakeDataGenerator
+from recipes.models import (Favorite, Ingredient, IngredientsRecipe, Recipe,
+                            ShoppingList)
+from recipes.similarity import build_similar_recipes
+from users.models import Follow, UserModel
+
+ENDPOINTS = (
+    ('tags', '/api/tags/', False),
+    ('ingredients_search', '/api/ingredients/?name=са', False),
+    ('recipes_list_anonymous', '/api/recipes/', False),
+    ('recipes_list', '/api/recipes/?limit=6', True),
+    ('recipes_list_by_tag', '/api/recipes/?tags=lunch&limit=6', True),
+    ('recipes_favorited', '/api/recipes/?is_favorited=1&limit=6', True),
+    ('recipes_cursor', '/api/recipes/?pagination=cursor&limit=6', True),
+    ('recipes_search', '/api/recipes/?search=домашний&limit=6', True),
+    ('recipe_detail', '/api/recipes/{recipe}/', True),
+    ('recipes_feed', '/api/recipes/feed/?limit=6', True),
+    ('recipe_similar', '/api/recipes/{recipe}/similar/?limit=6', True),
+    ('subscriptions', '/api/users/subscriptions/?recipes_limit=3', True),
+    ('users_list', '/api/users/', True),
+    ('users_me', '/api/users/me/', True),
+    ('download_shopping_cart', '/api/recipes/download_shopping_cart/', True),
+    (
+        'download_shopping_cart_csv',
+        '/api/recipes/download_shopping_cart/?file_format=csv',
+        True
+    ),
+)
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(values, rank):
+    return values[min(len(values) - 1, len(values) * rank // 100)]
+
+
+def summarize(durations, query_counts):
+    durations = sorted(duration * 1000 for duration in durations)
+    latency = {
+        f'p{rank}': round(percentile(durations, rank), 3)
+        for rank in PERCENTILES
+    }
+    latency.update(
+        min=round(durations[0], 3),
+        mean=round(statistics.mean(durations), 3),
+        max=round(durations[-1], 3),
+    )
+    return {
+        'latency_ms': latency,
+        'queries': {'min': min(query_counts), 'max': max(query_counts)},
+    }
+
+
+class Command(BaseCommand):
+
+    help = ('Наполняет тестовую базу данными и замеряет время ответа '
+            'и количество запросов к базе для эндпоинтов API')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=10)
+        parser.add_argument('--favorites', type=int, default=15)
+        parser.add_argument('--carts', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            dest='endpoints',
+            help='Замерить только указанные эндпоинты',
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Файл для результатов в формате JSON, по умолчанию stdout',
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Не удалять тестовую базу и не наполнять её повторно',
+        )
+
+    def handle(self, *args, **options):
+        self.progress = sys.stderr if options['output'] == '-' else self.stdout
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        query_logger = logging.getLogger('api.queries')
+        query_log_level = query_logger.level
+        query_logger.setLevel(logging.ERROR)
+        try:
+            connection.creation.create_test_db(
+                verbosity=0,
+                autoclobber=True,
+                serialize=False,
+                keepdb=options['keepdb']
+            )
+            if not (options['keepdb'] and Recipe.objects.exists()):
+                self.seed(options)
+            report = self.run_benchmarks(options)
+        finally:
+            query_logger.setLevel(query_log_level)
+            connection.creation.destroy_test_db(
+                old_name,
+                verbosity=0,
+                keepdb=options['keepdb']
+            )
+            teardown_test_environment()
+
+        content = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(content)
+        else:
+            with open(options['output'], 'w', encoding='utf8') as file:
+                file.write(content)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты сохранены в {options["output"]}'
+            ))
+
+    def log(self, message):
+        self.progress.write(f'{message}\n')
+
+    def seed(self, options):
+        if not Ingredient.objects.exists():
+            self.log('Загрузка ингредиентов')
+            call_command(
+                'load_ingredients',
+                str(settings.BASE_DIR / 'data' / 'ingredients.json'),
+                stdout=self.progress
+            )
+        started = time.perf_counter()
+        FakeDataGenerator(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.log
+        ).generate(
+            users=options['users'],
+            recipes=options['recipes'],
+            follows=options['follows'],
+            favorites=options['favorites'],
+            carts=options['carts']
+        )
+        self.log('Похожие рецепты')
+        build_similar_recipes(stale_only=True, log=self.log)
+        self.log(f'Данные созданы за {time.perf_counter() - started:.1f} с')
+
+    def get_client(self):
+        user_id = Follow.objects.values('user').annotate(
+            total=Count('pk')
+        ).order_by('-total').values_list('user', flat=True).first()
+        user = UserModel.objects.get(
+            pk=user_id or UserModel.objects.values('pk')[:1]
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def measure(self, client, url, options):
+        durations = []
+        query_counts = []
+        status_code = None
+        for iteration in range(options['warmup'] + options['iterations']):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                else:
+                    response.content
+                duration = time.perf_counter() - started
+            if iteration >= options['warmup']:
+                durations.append(duration)
+                query_counts.append(len(queries))
+            status_code = response.status_code
+        return dict(url=url, status=status_code,
+                    **summarize(durations, query_counts))
+
+    def run_benchmarks(self, options):
+        client = self.get_client()
+        anonymous = APIClient()
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+
+        results = {}
+        for name, url, authenticated in ENDPOINTS:
+            if options['endpoints'] and name not in options['endpoints']:
+                continue
+            self.log(f'Замер {name}')
+            results[name] = self.measure(
+                client if authenticated else anonymous,
+                url.format(recipe=recipe.pk),
+                options
+            )
+
+        return {
+            'meta': {
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'seed': options['seed'],
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'rows': {
+                    model._meta.label: model.objects.count()
+                    for model in (UserModel, Recipe, IngredientsRecipe,
+                                  Follow, Favorite, ShoppingList)
+                },
+            },
+            'results': results,
+        }
@@ -0,0 +1,67 @@
+import os
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+UNMATCHED_ENDPOINT = 'unmatched'
+
+if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    ('endpoint', 'method', 'status'),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+REQUESTS = Counter(
+    'foodgram_requests',
+    'Количество запросов',
+    ('endpoint', 'method', 'status')
+)
+
+REQUEST_ERRORS = Counter(
+    'foodgram_request_errors',
+    'Количество ответов с кодом 4xx и 5xx',
+    ('endpoint', 'method', 'status')
+)
+
+DB_QUERIES = Histogram(
+    'foodgram_db_queries_per_request',
+    'Количество запросов к базе данных за запрос',
+    ('endpoint',),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+
+DB_DURATION = Histogram(
+    'foodgram_db_duration_seconds',
+    'Время запросов к базе данных за запрос',
+    ('endpoint',),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+
+def observe_request(endpoint, method, status, duration, queries,
+                    db_duration):
+    endpoint = endpoint or UNMATCHED_ENDPOINT
+    status = str(status)
+    REQUEST_LATENCY.labels(endpoint, method, status).observe(duration)
+    REQUESTS.labels(endpoint, method, status).inc()
+    if int(status) >= 400:
+        REQUEST_ERRORS.labels(endpoint, method, status).inc()
+    DB_QUERIES.labels(endpoint).observe(queries)
+    DB_DURATION.labels(endpoint).observe(db_duration)
+
+
+def get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
@@ -0,0 +1,144 @@
+import heapq
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from api.metrics import observe_request
+
+logger = logging.getLogger('api.queries')
+
+
+class QueryStats:
+
+    def __init__(self, slowest_size):
+        self.slowest_size = slowest_size
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if len(self.slowest) < self.slowest_size:
+                heapq.heappush(self.slowest, (duration, self.count, sql))
+            elif self.slowest and duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (duration, self.count, sql))
+
+    def slowest_statements(self):
+        return [
+            {'ms': round(duration * 1000, 2), 'sql': sql}
+            for duration, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+def get_endpoint(view_func, method):
+
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+class QueryInstrumentationMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @property
+    def config(self):
+        return getattr(settings, 'QUERY_INSTRUMENTATION', {})
+
+    def __call__(self, request):
+        request.query_endpoint = None
+        stats = QueryStats(self.config.get('SLOWEST_STATEMENTS', 3))
+        start = time.perf_counter()
+        with self.instrument(stats):
+            response = self.get_response(request)
+
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, response, stats, start
+            )
+            return response
+
+        duration = time.perf_counter() - start
+        response['X-DB-Queries'] = str(stats.count)
+        response['Server-Timing'] = (
+            f'db;dur={stats.duration * 1000:.1f};'
+            f'desc="{stats.count} queries", '
+            f'app;dur={duration * 1000:.1f}'
+        )
+        self.finish(request, response, stats, duration)
+        return response
+
+    def instrument(self, stats):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        return stack
+
+    def stream(self, content, request, response, stats, start):
+        iterator = iter(content)
+        try:
+            while True:
+                with self.instrument(stats):
+                    chunk = next(iterator, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.finish(
+                request, response, stats, time.perf_counter() - start
+            )
+
+    def finish(self, request, response, stats, duration):
+        self.log(request, response, stats, duration)
+        observe_request(
+            request.query_endpoint,
+            request.method,
+            response.status_code,
+            duration,
+            stats.count,
+            stats.duration
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_endpoint = get_endpoint(view_func, request.method)
+
+    def log(self, request, response, stats, duration):
+        endpoint = request.query_endpoint or request.path
+        record = {
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.count,
+            'db_ms': round(stats.duration * 1000, 2),
+            'total_ms': round(duration * 1000, 2),
+            'slowest': stats.slowest_statements(),
+        }
+        logger.info(
+            '%s %s status=%s queries=%s db_ms=%s total_ms=%s',
+            endpoint, request.method, record['status'], record['queries'],
+            record['db_ms'], record['total_ms'],
+            extra={'query_stats': record}
+        )
+
+        budget = self.config.get('BUDGETS', {}).get(endpoint)
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                '%s exceeded query budget: %s > %s, slowest: %s',
+                endpoint, stats.count, budget, record['slowest'],
+                extra={'query_stats': record}
+            )
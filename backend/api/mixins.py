@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from api.versions import get_version
+
+
+class CatalogCacheMixin:
+
+    catalog_cache_timeout = 60 * 60 * 24
+
+    def list(self, request, *args, **kwargs):
+
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        version = get_version('catalog')
+        use_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        etag = f'"{self.basename}-{version}{"-gzip" if use_gzip else ""}"'
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if etag in parse_etags(if_none_match) or if_none_match == '*':
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            response['Vary'] = 'Accept-Encoding'
+            return response
+
+        key = f'catalog:{self.basename}:{version}'
+        payload = cache.get(key)
+        if payload is None:
+            data = super().list(request, *args, **kwargs).data
+            content = JSONRenderer().render(data)
+            payload = (content, gzip.compress(content))
+            cache.set(key, payload, self.catalog_cache_timeout)
+
+        content, compressed = payload
+        response = HttpResponse(
+            compressed if use_gzip else content,
+            content_type='application/json'
+        )
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class AnonymousCacheMixin:
+
+    anonymous_cache_timeout = 60 * 5
+    anonymous_cache_version = 'recipes'
+    anonymous_cache_params = ('page', 'limit', 'tags', 'author')
+
+    def get_anonymous_cache_key(self, request):
+
+        if not request.user.is_anonymous:
+            return None
+        if set(request.query_params) - set(self.anonymous_cache_params):
+            return None
+
+        params = sorted(
+            (name, sorted(set(request.query_params.getlist(name))))
+            for name in request.query_params
+        )
+        digest = hashlib.sha256(repr((
+            request.build_absolute_uri('/'),
+            self.action,
+            self.kwargs.get(self.lookup_url_kwarg or self.lookup_field),
+            params
+        )).encode()).hexdigest()
+        version = get_version(self.anonymous_cache_version)
+        return f'anonymous:{self.basename}:{version}:{digest}'
+
+    def get_cached_response(self, request, handler, *args, **kwargs):
+
+        key = self.get_anonymous_cache_key(request)
+        if key is None:
+            return handler(request, *args, **kwargs)
+
+        content = cache.get(key)
+        if content is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            content = JSONRenderer().render(response.data)
+            cache.set(key, content, self.anonymous_cache_timeout)
+        return HttpResponse(content, content_type='application/json')
+
+    def list(self, request, *args, **kwargs):
+
+        return self.get_cached_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+
+        return self.get_cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
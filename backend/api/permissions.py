@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import permissions
 
 
@@ -13,3 +14,12 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         return obj.author == request.user
+
+
+class IsMetricsClient(permissions.BasePermission):
+
+    def has_permission(self, request, view):
+        return (
+            request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+            or request.user.is_staff
+        )
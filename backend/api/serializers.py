@@ -1,19 +1,32 @@
+import hashlib
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
-from django.db import transaction
+from django.core.cache import cache
+from django.db import models, transaction
 from drf_extra_fields.fields import Base64ImageField
 
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
 from users.models import Follow
-from recipes.models import (Ingredient, IngredientsRecipe, Recipe, Tag)
-from api.utils import bulk_create_data
+from recipes.feed import schedule_fan_out
+from recipes.models import (CartIngredientTotal, Ingredient,
+                            IngredientsRecipe, Recipe, Tag,
+                            prefetch_recipe_details)
+from api.fields import (BulkPrimaryKeyRelatedField,
+                        BulkRelatedListSerializer, ImageVariantsField)
+from api.utils import (bulk_create_data, update_ingredients_data,
+                       update_tags_data)
+from api.versions import get_version
+from api.viewer import get_viewer_ids
 
 UserModel = get_user_model()
 
 symbol_limits = [1, 128, 254, 1000]
 
+RECIPE_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
 
 class TagSerializer(serializers.ModelSerializer):
 
@@ -56,11 +69,7 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
 
-        user = self.context['request'].user
-
-        if user.is_anonymous:
-            return False
-        return Follow.objects.filter(user=user, author=obj).exists()
+        return obj.pk in get_viewer_ids(self.context.get('request'), 'follows')
 
     def validate(self, data):
 
@@ -97,12 +106,43 @@ class ChangePasswordSerializer(serializers.Serializer):
     )
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=symbol_limits[0]),
+        allow_empty=False,
+        max_length=symbol_limits[1]
+    )
+
+
+class LimitSerializer(serializers.Serializer):
+
+    limit = serializers.IntegerField(
+        min_value=symbol_limits[0],
+        required=False
+    )
+
+
+class RecipesLimitSerializer(serializers.Serializer):
+
+    recipes_limit = serializers.IntegerField(
+        min_value=symbol_limits[0],
+        required=False
+    )
+
+
 class RecipeFollowSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
+    image_srcset = ImageVariantsField(
+        source='image_variants',
+        srcset=True
+    )
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'image_srcset',
+                  'cooking_time')
 
 
 class FollowSerializer(serializers.ModelSerializer):
@@ -131,7 +171,7 @@ class FollowSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
 
     recipes_count = serializers.ReadOnlyField(
-        source='author.recipes.count'
+        source='author.recipes_count'
     )
 
     class Meta:
@@ -141,18 +181,21 @@ class FollowSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
 
-        return Follow.objects.filter(
-            user=obj.user,
-            author=obj.author
-        ).exists()
+        return True
 
     def get_recipes(self, obj):
 
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
+        author_recipes = self.context.get('author_recipes')
+        if author_recipes is not None:
+            return RecipeFollowSerializer(
+                author_recipes[obj.author_id],
+                many=True
+            ).data
+
+        limit = self.context.get('recipes_limit')
         queryset = obj.author.recipes.all()
         if limit:
-            queryset = queryset[:int(limit)]
+            queryset = queryset[:limit]
         return RecipeFollowSerializer(queryset, many=True).data
 
     def validate(self, data):
@@ -175,6 +218,20 @@ class FollowSerializer(serializers.ModelSerializer):
         return data
 
 
+class RecipeGetListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+
+        if isinstance(data, models.Manager):
+            data = data.all()
+        recipes = list(data)
+        fragments = self.child.get_fragments(recipes)
+        return [
+            self.child.merge_fragment(fragments[recipe.pk], recipe)
+            for recipe in recipes
+        ]
+
+
 class RecipeGetSerializer(serializers.ModelSerializer):
 
     image = Base64ImageField(
@@ -193,34 +250,100 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
+    image_variants = ImageVariantsField()
+    image_srcset = ImageVariantsField(
+        source='image_variants',
+        srcset=True
+    )
+
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
+    viewer_fields = ('author', 'is_favorited', 'is_in_shopping_cart')
+
     class Meta:
         model = Recipe
         fields = ('id', 'author', 'name', 'text', 'ingredients', 'tags',
                   'cooking_time', 'is_favorited', 'is_in_shopping_cart',
-                  'image')
+                  'image', 'image_variants', 'image_srcset')
         read_only_fields = ('id', 'author', 'tags')
+        list_serializer_class = RecipeGetListSerializer
+
+    def to_representation(self, instance):
+
+        fragment = self.get_fragments([instance])[instance.pk]
+        return self.merge_fragment(fragment, instance)
+
+    def get_fragment_prefix(self):
+
+        request = self.context.get('request')
+        host = request.build_absolute_uri('/') if request else ''
+        return 'recipe:{}:{}'.format(
+            get_version('catalog'),
+            hashlib.sha256(host.encode()).hexdigest()[:16]
+        )
+
+    def get_fragments(self, recipes):
+
+        prefix = self.get_fragment_prefix()
+        keys = {
+            recipe.pk: f'{prefix}:{recipe.pk}:{recipe.version}'
+            for recipe in recipes
+        }
+        fragments = cache.get_many(keys.values())
+
+        missing = [
+            recipe for recipe in recipes if keys[recipe.pk] not in fragments
+        ]
+        if missing:
+            prefetch_recipe_details(missing)
+            created = {
+                keys[recipe.pk]: self.build_fragment(recipe)
+                for recipe in missing
+            }
+            cache.set_many(created, RECIPE_FRAGMENT_TIMEOUT)
+            fragments.update(created)
+
+        return {pk: fragments[key] for pk, key in keys.items()}
+
+    def build_fragment(self, instance):
+
+        fragment = {}
+        for field in self._readable_fields:
+            if field.field_name in self.viewer_fields:
+                continue
+            attribute = field.get_attribute(instance)
+            fragment[field.field_name] = (
+                None if attribute is None
+                else field.to_representation(attribute)
+            )
+        return fragment
+
+    def merge_fragment(self, fragment, instance):
+
+        representation = {}
+        for field in self._readable_fields:
+            if field.field_name in self.viewer_fields:
+                representation[field.field_name] = field.to_representation(
+                    field.get_attribute(instance)
+                )
+            else:
+                representation[field.field_name] = fragment[field.field_name]
+        return representation
 
     def get_is_favorited(self, obj):
 
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return obj.favorites.filter(user=user).exists()
+        return obj.pk in get_viewer_ids(
+            self.context.get('request'), 'favorites'
+        )
 
     def get_is_in_shopping_cart(self, obj):
 
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return obj.cart.filter(user=user).exists()
+        return obj.pk in get_viewer_ids(self.context.get('request'), 'cart')
 
     def get_ingredients(self, obj):
 
-        ingredients_recipes = IngredientsRecipe.objects.filter(recipe=obj)
-        return IngredientsRecipeGetSerializer(ingredients_recipes,
+        return IngredientsRecipeGetSerializer(obj.amount.all(),
                                               many=True
                                               ).data
 
@@ -250,6 +373,12 @@ class IngredientsRecipeGetSerializer(serializers.ModelSerializer):
         )
 
 
+class IngredientsRecipeListSerializer(BulkRelatedListSerializer):
+
+    related_field = 'ingredient'
+    queryset = Ingredient.objects.all()
+
+
 class IngredientsRecipeSerializer(serializers.ModelSerializer):
 
     recipe = serializers.PrimaryKeyRelatedField(
@@ -261,14 +390,14 @@ class IngredientsRecipeSerializer(serializers.ModelSerializer):
         write_only=True
     )
 
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all()
+    id = serializers.IntegerField(
+        source='ingredient'
     )
 
     class Meta:
         model = IngredientsRecipe
         fields = ('id', 'amount', 'recipe')
+        list_serializer_class = IngredientsRecipeListSerializer
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -280,9 +409,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     author = UserSerializer(
         read_only=True)
 
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
+    tags = BulkPrimaryKeyRelatedField(
+        queryset=Tag.objects.all()
     )
 
     image = Base64ImageField(
@@ -305,7 +433,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
 
-        ingredients = self.initial_data.get('ingredients')
+        ingredients = self.initial_data.get('ingredients', ())
         ingredients_cart = [ingredient['id'] for ingredient in ingredients]
 
         if len(ingredients_cart) != len(set(ingredients_cart)):
@@ -344,27 +472,25 @@ class RecipeSerializer(serializers.ModelSerializer):
             recipe,
             ingredients_data
         )
+        schedule_fan_out(recipe)
         return recipe
 
     def update(self, instance, validated_data):
 
-        if 'tags' in self.validated_data:
+        deltas = None
+        with transaction.atomic():
+            if 'tags' in self.validated_data:
+                update_tags_data(instance, validated_data.pop('tags'))
 
-            tags_data = validated_data.pop('tags')
-            instance.tags.set(tags_data)
-
-        if 'ingredients' in self.validated_data:
-
-            ingredients_data = validated_data.pop('ingredients')
-            with transaction.atomic():
-                amount_set = IngredientsRecipe.objects.filter(
-                    recipe__id=instance.id
-                )
-                amount_set.delete()
-                bulk_create_data(
+            if 'ingredients' in self.validated_data:
+                deltas = update_ingredients_data(
                     IngredientsRecipe,
                     instance,
-                    ingredients_data
+                    validated_data.pop('ingredients')
                 )
+                CartIngredientTotal.objects.change_recipe(instance, deltas)
 
-        return super().update(instance, validated_data)
+            instance = super().update(instance, validated_data)
+            if deltas:
+                Recipe.objects.filter(pk=instance.pk).mark_similar_stale()
+            return instance
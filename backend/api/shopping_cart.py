@@ -0,0 +1,85 @@
+import csv
+import io
+import os
+
+from django.conf import settings
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+except ImportError:
+    canvas = None
+
+SHOPPING_CART_TITLE = 'Необходимые продукты:'
+
+PDF_FONT_NAME = 'ShoppingCartFont'
+PDF_CHUNK_SIZE = 64 * 1024
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+def render_txt(items):
+
+    yield f'{SHOPPING_CART_TITLE}\n'
+    for name, measurement_unit, amount in items:
+        yield f'\n{name} ({measurement_unit}) - {amount};'
+
+
+def render_csv(items):
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in items:
+        yield writer.writerow(row)
+
+
+def get_pdf_font():
+
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+
+    font_path = getattr(settings, 'SHOPPING_CART_PDF_FONT', None)
+    if font_path and os.path.exists(font_path):
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+        return PDF_FONT_NAME
+    return 'Helvetica'
+
+
+def render_pdf(items):
+
+    buffer = io.BytesIO()
+    font = get_pdf_font()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    _, height = A4
+    top, bottom, step = height - 50, 50, 18
+
+    pdf.setFont(font, 16)
+    pdf.drawString(50, top, SHOPPING_CART_TITLE)
+    y = top - 2 * step
+    pdf.setFont(font, 12)
+    for name, measurement_unit, amount in items:
+        if y < bottom:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            y = top
+        pdf.drawString(50, y, f'{name} ({measurement_unit}) - {amount}')
+        y -= step
+    pdf.save()
+
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(PDF_CHUNK_SIZE), b'')
+
+
+SHOPPING_CART_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', render_txt),
+    'csv': ('text/csv; charset=utf-8', render_csv),
+}
+
+if canvas is not None:
+    SHOPPING_CART_FORMATS['pdf'] = ('application/pdf', render_pdf)
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_token, invalidate_user
+from api.versions import bump_version_on_commit
+from recipes.models import Ingredient, Recipe, Tag
+
+UserModel = get_user_model()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_ingredients_version(**kwargs):
+    bump_version_on_commit('ingredients')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_catalog_version(**kwargs):
+    bump_version_on_commit('catalog')
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_recipes_version(**kwargs):
+    bump_version_on_commit('recipes')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipes_version_on_tags_change(action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version_on_commit('recipes')
+
+
+@receiver(pre_delete, sender=Recipe)
+def mark_similar_stale_on_recipe_delete(instance, **kwargs):
+    Recipe.objects.filter(pk=instance.pk).mark_similar_stale()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipes_on_tags_change(instance, action, reverse, pk_set,
+                                 **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Recipe.objects.filter(pk=instance.pk).touch()
+    elif action == 'pre_clear':
+        Recipe.objects.filter(tags=instance).touch()
+    elif action in ('post_add', 'post_remove'):
+        Recipe.objects.filter(pk__in=pk_set).touch()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    key, user_id = instance.key, instance.user_id
+    transaction.on_commit(lambda: invalidate_token(key, user_id))
+
+
+@receiver(post_save, sender=UserModel)
+def invalidate_user_tokens(instance, created, **kwargs):
+    if not created:
+        user_id = instance.pk
+        transaction.on_commit(lambda: invalidate_user(user_id))
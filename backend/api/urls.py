@@ -2,9 +2,9 @@ from django.urls import include, path
 from rest_framework import routers
 
 
-from api.views import (FollowListViewSet, IngredientsViewSet, RecipesViewSet,
-                       SubscribeViewSet, TagsViewSet, UserLoginViewSet,
-                       UserLogoutViewSet, UserViewSet)
+from api.views import (FollowListViewSet, IngredientsViewSet, MetricsView,
+                       RecipesViewSet, SubscribeViewSet, TagsViewSet,
+                       UserLoginViewSet, UserLogoutViewSet, UserViewSet)
 
 app_name = 'api'
 
@@ -63,4 +63,5 @@ urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
     path('', include(router.urls)),
     path('users/me/', UserViewSet.as_view({'get': 'me'}), name='current_user'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
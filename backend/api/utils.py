@@ -1,3 +1,10 @@
+from django.contrib.auth import get_user_model
+
+from recipes.models import Recipe
+
+UserModel = get_user_model()
+
+
 def bulk_create_data(model, instance, some_data):
     part_data = (
         model(
@@ -7,3 +14,71 @@ def bulk_create_data(model, instance, some_data):
         for ingredient_data in some_data
     )
     model.objects.bulk_create(part_data)
+
+
+def update_ingredients_data(model, instance, some_data):
+    current = {
+        part.ingredient_id: part
+        for part in model.objects.filter(recipe=instance)
+    }
+    amounts = {
+        ingredient_data['ingredient'].id: ingredient_data['amount']
+        for ingredient_data in some_data
+    }
+    deltas = {}
+
+    changed = []
+    for ingredient_id, amount in amounts.items():
+        part = current.get(ingredient_id)
+        if part is not None and part.amount != amount:
+            deltas[ingredient_id] = amount - part.amount
+            part.amount = amount
+            changed.append(part)
+    if changed:
+        model.objects.bulk_update(changed, ('amount',))
+
+    created = [
+        ingredient_data for ingredient_data in some_data
+        if ingredient_data['ingredient'].id not in current
+    ]
+    if created:
+        bulk_create_data(model, instance, created)
+        deltas.update(
+            (ingredient_data['ingredient'].id, ingredient_data['amount'])
+            for ingredient_data in created
+        )
+
+    removed = [
+        ingredient_id for ingredient_id in current
+        if ingredient_id not in amounts
+    ]
+    if removed:
+        model.objects.filter(
+            recipe=instance,
+            ingredient_id__in=removed
+        ).delete()
+        deltas.update(
+            (ingredient_id, -current[ingredient_id].amount)
+            for ingredient_id in removed
+        )
+    if deltas:
+        Recipe.objects.filter(pk=instance.pk).touch()
+    return deltas
+
+
+def update_tags_data(instance, tags_data):
+    current = set(instance.tags.values_list('id', flat=True))
+    tags = {tag.id: tag for tag in tags_data}
+
+    removed = current - tags.keys()
+    if removed:
+        instance.tags.remove(*removed)
+    added = [tag for tag_id, tag in tags.items() if tag_id not in current]
+    if added:
+        instance.tags.add(*added)
+
+
+def lock_user(user):
+    list(UserModel.objects.select_for_update().filter(
+        pk=user.pk
+    ).values_list('pk', flat=True))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+
+
+def get_version(name):
+    return cache.get_or_set(
+        VERSION_KEY.format(name),
+        lambda: time.time_ns() // 1000,
+        timeout=None
+    )
+
+
+def bump_version(name):
+    key = VERSION_KEY.format(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        get_version(name)
+        return cache.incr(key)
+
+
+def bump_version_on_commit(name):
+    transaction.on_commit(lambda: bump_version(name))
@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from api.versions import bump_version, get_version
+from recipes.models import Favorite, ShoppingList
+from users.models import Follow
+
+VIEWER_IDS_TIMEOUT = 60 * 60
+
+VIEWER_SETS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'cart': (ShoppingList, 'recipe_id'),
+    'follows': (Follow, 'author_id'),
+}
+
+
+def get_keys(user_id, name):
+    return f'viewer:{user_id}:{name}', f'viewer-ids:{user_id}:{name}'
+
+
+def load_viewer_ids(user_id, name):
+    version_name, key = get_keys(user_id, name)
+    version = get_version(version_name)
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    model, field = VIEWER_SETS[name]
+    ids = frozenset(
+        model.objects.filter(user_id=user_id).values_list(field, flat=True)
+    )
+    cache.set(key, (version, ids), VIEWER_IDS_TIMEOUT)
+    return ids
+
+
+def get_viewer_ids(request, name):
+    if request is None or request.user.is_anonymous:
+        return frozenset()
+
+    viewer_ids = getattr(request, 'viewer_ids', None)
+    if viewer_ids is None:
+        viewer_ids = request.viewer_ids = {}
+    if name not in viewer_ids:
+        viewer_ids[name] = load_viewer_ids(request.user.pk, name)
+    return viewer_ids[name]
+
+
+def invalidate_viewer_ids(user_id, name):
+    version_name, key = get_keys(user_id, name)
+    bump_version(version_name)
+    cache.delete(key)
+
+
+def update_viewer_ids(user_id, name, added=(), removed=()):
+    if added or removed:
+        transaction.on_commit(lambda: invalidate_viewer_ids(user_id, name))
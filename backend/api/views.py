@@ -1,31 +1,52 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from api.serializers import (ChangePasswordSerializer, FollowSerializer,
-                             IngredientSerializer, RecipeFollowSerializer,
-                             RecipeGetSerializer, RecipeSerializer,
+                             IngredientSerializer, LimitSerializer,
+                             RecipeFollowSerializer,
+                             RecipeGetSerializer, RecipeIdsSerializer,
+                             RecipesLimitSerializer, RecipeSerializer,
                              TagSerializer, UserLoginSerializer,
                              UserSerializer,
                              )
 from api.filters import IngredientFilter, RecipeFilter
-from api.paginators import PageLimitPagination
-from recipes.models import (Favorite, Ingredient, IngredientsRecipe,
-                            Recipe, ShoppingList, Tag)
+from api.ingredient_index import ingredient_index
+from api.metrics import render_metrics
+from api.mixins import AnonymousCacheMixin, CatalogCacheMixin
+from api.paginators import (KeysetPagination, PageLimitPagination,
+                            RecipeCursorPagination)
+from api.permissions import IsMetricsClient
+from api.shopping_cart import SHOPPING_CART_FORMATS
+from api.utils import lock_user
+from api.viewer import update_viewer_ids
+from recipes.counters import change_counter, change_counters
+from recipes.feed import follow_author, get_feed_page, unfollow_author
+from recipes.models import (CartIngredientTotal, Favorite, Ingredient,
+                            Recipe, ShoppingList, SimilarRecipe, Tag)
 from users.models import Follow
 
 UserModel = get_user_model()
 
 
+def get_recipes_limit(request):
+    serializer = RecipesLimitSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data.get('recipes_limit')
+
+
 class UserViewSet(viewsets.ModelViewSet):
 
     queryset = UserModel.objects.all()
@@ -54,7 +75,7 @@ class UserViewSet(viewsets.ModelViewSet):
             return Response(message, status=status.HTTP_401_UNAUTHORIZED)
 
         current_user.set_password(serializer.validated_data['new_password'])
-        current_user.save()
+        current_user.save(update_fields=('password',))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -81,14 +102,20 @@ class SubscribeViewSet(viewsets.GenericViewSet,
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = FollowSerializer
 
+    @transaction.atomic
     def perform_create(self, serializer):
 
-        serializer.save(
+        follow = serializer.save(
             user=self.request.user,
             author=get_object_or_404(
                 UserModel, pk=self.kwargs.get('id')
             )
         )
+        change_counter(UserModel, follow.author_id, 'followers_count', 1)
+        update_viewer_ids(
+            self.request.user.id, 'follows', added=(follow.author_id,)
+        )
+        follow_author(self.request.user.id, follow.author_id)
 
     def delete(self, request, *args, **kwargs):
 
@@ -103,13 +130,20 @@ class SubscribeViewSet(viewsets.GenericViewSet,
         )
 
         if follow.exists():
-            follow.delete()
+            with transaction.atomic():
+                follow.delete()
+                change_counter(UserModel, author.id, 'followers_count', -1)
+                update_viewer_ids(
+                    request.user.id, 'follows', removed=(author.id,)
+                )
+                unfollow_author(request.user.id, author.id)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     def get_serializer_context(self):
 
         context = super().get_serializer_context()
         context['id'] = int(self.kwargs.get('id'))
+        context['recipes_limit'] = get_recipes_limit(self.request)
         return context
 
 
@@ -164,25 +198,37 @@ class UserLogoutViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin,):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+class TagsViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    authentication_classes = ()
     permission_classes = (AllowAny,)
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
+    authentication_classes = ()
     permission_classes = (AllowAny,)
 
+    def list(self, request, *args, **kwargs):
+
+        name = request.query_params.get('name')
+        if name and 'measurement_unit' not in request.query_params:
+            return Response(ingredient_index.search(
+                name,
+                settings.INGREDIENT_SEARCH_LIMIT
+            ))
+        return super().list(request, *args, **kwargs)
 
-class RecipesViewSet(viewsets.ModelViewSet):
+
+class RecipesViewSet(AnonymousCacheMixin, viewsets.ModelViewSet):
 
     pagination_class = PageLimitPagination
     filter_backends = (DjangoFilterBackend,)
@@ -191,6 +237,16 @@ class RecipesViewSet(viewsets.ModelViewSet):
 
     queryset = Recipe.objects.all()
 
+    @property
+    def paginator(self):
+
+        if (
+            not hasattr(self, '_paginator')
+            and self.request.query_params.get('pagination') == 'cursor'
+        ):
+            self._paginator = RecipeCursorPagination()
+        return super().paginator
+
     def destroy(self, request, *args, **kwargs):
 
         instance = self.get_object()
@@ -207,10 +263,12 @@ class RecipesViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
 
+        queryset = Recipe.objects.for_listing()
+
         is_favorited = self.request.query_params.get('is_favorited') or False
 
         if is_favorited:
-            return Recipe.objects.filter(
+            return queryset.filter(
                 favorites__user=self.request.user
             )
 
@@ -218,14 +276,23 @@ class RecipesViewSet(viewsets.ModelViewSet):
             'is_in_shopping_cart') or False
 
         if is_in_shopping_cart:
-            return Recipe.objects.filter(
+            return queryset.filter(
                 cart__user=self.request.user
             )
 
-        return Recipe.objects.all()
+        return queryset
 
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        change_counter(UserModel, self.request.user.id, 'recipes_count', 1)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+
+        CartIngredientTotal.objects.discard_recipe(instance)
+        instance.delete()
+        change_counter(UserModel, instance.author_id, 'recipes_count', -1)
 
     @action(detail=True, methods=('POST', 'DELETE'), )
     def favorite(self, request, pk):
@@ -248,10 +315,17 @@ class RecipesViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            Favorite.objects.get_or_create(
-                user=request.user,
-                recipe=recipe
-            )
+            with transaction.atomic():
+                lock_user(request.user)
+                _, created = Favorite.objects.get_or_create(
+                    user=request.user,
+                    recipe=recipe
+                )
+                if created:
+                    change_counter(Recipe, recipe.id, 'favorites_count', 1)
+                    update_viewer_ids(
+                        request.user.id, 'favorites', added=(recipe.id,)
+                    )
 
             data = RecipeFollowSerializer(recipe).data
             return Response(
@@ -265,8 +339,16 @@ class RecipesViewSet(viewsets.ModelViewSet):
             recipe=recipe
         )
 
-        if favorite.exists():
-            favorite.delete()
+        with transaction.atomic():
+            lock_user(request.user)
+            deleted, _ = favorite.delete()
+            if deleted:
+                change_counter(Recipe, recipe.id, 'favorites_count', -1)
+                update_viewer_ids(
+                    request.user.id, 'favorites', removed=(recipe.id,)
+                )
+
+        if deleted:
             return Response(
                 'Рецепт успешно удален из списка "Избранное".',
                 status=status.HTTP_204_NO_CONTENT
@@ -298,10 +380,21 @@ class RecipesViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            ShoppingList.objects.get_or_create(
-                user=request.user,
-                recipe=recipe
-            )
+            with transaction.atomic():
+                lock_user(request.user)
+                _, created = ShoppingList.objects.get_or_create(
+                    user=request.user,
+                    recipe=recipe
+                )
+                if created:
+                    CartIngredientTotal.objects.add_recipes(
+                        request.user,
+                        (recipe.id,)
+                    )
+                    change_counter(Recipe, recipe.id, 'in_carts_count', 1)
+                    update_viewer_ids(
+                        request.user.id, 'cart', added=(recipe.id,)
+                    )
 
             data = RecipeFollowSerializer(recipe).data
             return Response(data, status=status.HTTP_201_CREATED)
@@ -316,8 +409,20 @@ class RecipesViewSet(viewsets.ModelViewSet):
             recipe=recipe
         )
 
-        if follow.exists():
-            follow.delete()
+        with transaction.atomic():
+            lock_user(request.user)
+            deleted, _ = follow.delete()
+            if deleted:
+                CartIngredientTotal.objects.remove_recipes(
+                    request.user,
+                    (recipe.id,)
+                )
+                change_counter(Recipe, recipe.id, 'in_carts_count', -1)
+                update_viewer_ids(
+                    request.user.id, 'cart', removed=(recipe.id,)
+                )
+
+        if deleted:
             return Response(
                 'Рецепт успешно удален из списка "Избранное".',
                 status=status.HTTP_204_NO_CONTENT
@@ -328,35 +433,154 @@ class RecipesViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    @action(detail=False, methods=('GET',), )
+    def change_recipe_list(self, request, model, counter_field, viewer_set,
+                           on_added=None, on_removed=None):
+
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(
+            serializer.validated_data['recipes']
+        ))
+
+        recipes = Recipe.objects.only('id').in_bulk(recipe_ids)
+        found = [pk for pk in recipe_ids if pk in recipes]
+        results = dict.fromkeys(recipe_ids, 'not_found')
+
+        with transaction.atomic():
+            lock_user(request.user)
+            existing = set(model.objects.filter(
+                user=request.user,
+                recipe_id__in=found
+            ).values_list('recipe_id', flat=True))
+            if request.method == 'POST':
+                added = [pk for pk in found if pk not in existing]
+                model.objects.bulk_create(
+                    model(user=request.user, recipe_id=pk) for pk in added
+                )
+                change_counters(Recipe, added, counter_field, 1)
+                update_viewer_ids(request.user.id, viewer_set, added=added)
+                if on_added and added:
+                    on_added(request.user, added)
+                results.update(dict.fromkeys(existing, 'already_exists'))
+                results.update(dict.fromkeys(added, 'added'))
+            else:
+                removed = [pk for pk in found if pk in existing]
+                model.objects.filter(
+                    user=request.user,
+                    recipe_id__in=removed
+                ).delete()
+                change_counters(Recipe, removed, counter_field, -1)
+                update_viewer_ids(
+                    request.user.id, viewer_set, removed=removed
+                )
+                if on_removed and removed:
+                    on_removed(request.user, removed)
+                results.update(dict.fromkeys(found, 'not_in_list'))
+                results.update(dict.fromkeys(removed, 'removed'))
+
+        return Response(
+            [
+                {'id': pk, 'status': status_name}
+                for pk, status_name in results.items()
+            ],
+            status=status.HTTP_200_OK
+        )
+
+    @action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        url_path='favorite',
+        url_name='favorite-batch'
+    )
+    def favorite_batch(self, request):
+
+        return self.change_recipe_list(
+            request, Favorite, 'favorites_count', 'favorites'
+        )
+
+    @action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch'
+    )
+    def shopping_cart_batch(self, request):
+
+        return self.change_recipe_list(
+            request,
+            ShoppingList,
+            'in_carts_count',
+            'cart',
+            on_added=CartIngredientTotal.objects.add_recipes,
+            on_removed=CartIngredientTotal.objects.remove_recipes
+        )
+
+    @action(
+        detail=False,
+        methods=('GET',),
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_keyset(
+            lambda before, limit: get_feed_page(request.user, before, limit),
+            request
+        )
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=('GET',))
+    def similar(self, request, pk=None):
+
+        top_k = settings.SIMILAR_RECIPES['TOP_K']
+        serializer = LimitSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        limit = min(serializer.validated_data.get('limit', top_k), top_k)
+
+        recipe = get_object_or_404(Recipe.objects.only('pk'), pk=pk)
+        similar = SimilarRecipe.objects.filter(
+            recipe=recipe
+        ).select_related('other__author').defer('other__search_vector')
+        recipes = [item.other for item in similar[:limit]]
+
+        serializer = self.get_serializer(recipes, many=True)
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=('GET',),
+        permission_classes=(IsAuthenticated,)
+    )
     def download_shopping_cart(self, request):
 
-        user = get_object_or_404(UserModel, username=request.user)
-        recipes_id = ShoppingList.objects.filter(user=user).values('recipe')
-        recipes = Recipe.objects.filter(pk__in=recipes_id)
-        shop_list = {}
-        n_rec = 0
-        for recipe in recipes:
-            n_rec += 1
-            ing_amounts = IngredientsRecipe.objects.filter(recipe=recipe)
-            for ing in ing_amounts:
-                if ing.ingredient.name in shop_list:
-                    shop_list[ing.ingredient.name][0] += ing.amount
-                else:
-                    shop_list[ing.ingredient.name] = [
-                        ing.amount,
-                        ing.ingredient.measurement_unit
-                    ]
-
-        text = ''
-        for key, value in shop_list.items():
-            text += f'\n\n{key} ({value[1]}) - {str(value[0])}; '
-
-        file = HttpResponse(
-            f'Необходимые продукты:\n {text}', content_type='text/plain'
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in SHOPPING_CART_FORMATS:
+            return Response(
+                {'errors': 'Формат файла не поддерживается. Доступные '
+                           f'форматы: {", ".join(SHOPPING_CART_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        items = CartIngredientTotal.objects.filter(
+            user=request.user
+        ).values_list(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'total_amount'
+        ).order_by(
+            'ingredient__name'
         )
 
-        file['Content-Disposition'] = ('attachment; filename=cart.txt')
+        content_type, render = SHOPPING_CART_FORMATS[file_format]
+        file = StreamingHttpResponse(
+            render(items.iterator()),
+            content_type=content_type
+        )
+
+        file['Content-Disposition'] = (
+            f'attachment; filename=cart.{file_format}'
+        )
         return file
 
 
@@ -366,5 +590,31 @@ class FollowListViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
 
     def get_queryset(self):
 
-        user = get_object_or_404(UserModel, username=self.request.user)
-        return user.follower.all()
+        return self.request.user.follower.select_related('author')
+
+    def list(self, request, *args, **kwargs):
+
+        limit = get_recipes_limit(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        follows = queryset if page is None else page
+
+        context = self.get_serializer_context()
+        context['author_recipes'] = Recipe.objects.by_authors(
+            [follow.author_id for follow in follows], limit
+        )
+
+        serializer = self.get_serializer(follows, many=True, context=context)
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
+
+class MetricsView(APIView):
+
+    permission_classes = (IsMetricsClient,)
+
+    def get(self, request):
+
+        content, content_type = render_metrics()
+        return HttpResponse(content, content_type=content_type)
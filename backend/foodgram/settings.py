@@ -42,6 +42,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.QueryInstrumentationMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -78,6 +79,21 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.getenv('CACHE_MAX_ENTRIES', default=1000000)
+            ),
+        },
+    }
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -109,7 +125,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -129,6 +145,73 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 AUTH_USER_MODEL = 'users.UserModel'
 
+TOKEN_AUTH_CACHE = {
+    'BACKEND': os.getenv('TOKEN_AUTH_CACHE_BACKEND', default='local'),
+    'CACHE_ALIAS': 'default',
+    'MAX_SIZE': int(os.getenv('TOKEN_AUTH_CACHE_MAX_SIZE', default=10000)),
+    'TTL': int(os.getenv('TOKEN_AUTH_CACHE_TTL', default=30)),
+}
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', default=50))
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+QUERY_INSTRUMENTATION = {
+    'SLOWEST_STATEMENTS': 3,
+    'BUDGETS': {
+        'TagsViewSet.list': 1,
+        'IngredientsViewSet.list': 1,
+        'RecipesViewSet.list': 8,
+        'RecipesViewSet.retrieve': 7,
+        'RecipesViewSet.feed': 8,
+        'RecipesViewSet.similar': 7,
+        'RecipesViewSet.download_shopping_cart': 2,
+        'FollowListViewSet.list': 5,
+        'UserViewSet.list': 3,
+    },
+}
+
+FEED = {
+    'CELEBRITY_FOLLOWERS': int(
+        os.getenv('FEED_CELEBRITY_FOLLOWERS', default=1000)
+    ),
+    'BATCH_SIZE': int(os.getenv('FEED_BATCH_SIZE', default=1000)),
+    'BACKFILL_PER_AUTHOR': int(
+        os.getenv('FEED_BACKFILL_PER_AUTHOR', default=50)
+    ),
+}
+
+SIMILAR_RECIPES = {
+    'TOP_K': int(os.getenv('SIMILAR_RECIPES_TOP_K', default=20)),
+    'MIN_SCORE': float(os.getenv('SIMILAR_RECIPES_MIN_SCORE', default=0.1)),
+    'BLOCK_SIZE': int(os.getenv('SIMILAR_RECIPES_BLOCK_SIZE', default=500)),
+}
+
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS',
+    default='127.0.0.1'
+).split(',')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.queries': {
+            'handlers': ['console'],
+            'level': os.getenv('QUERY_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 DJOSER = {
     'HIDE_USERS': False,
     'LOGIN_FIELD': 'email',
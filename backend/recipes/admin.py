@@ -2,8 +2,10 @@ from django.contrib import admin
 
 from recipes.models import (Tag, Ingredient, Recipe,
                             IngredientsRecipe, ShoppingList,
-                            Favorite,
+                            Favorite, CartIngredientTotal,
+                            FeedEntry, SimilarRecipe,
                             )
+from api.versions import bump_version_on_commit
 
 
 @admin.register(Ingredient)
@@ -34,6 +36,7 @@ class TagAdmin(admin.ModelAdmin):
 
 
 class RecipeIngredientInline(admin.StackedInline):
+    model = IngredientsRecipe
     min_num = 1
 
 
@@ -62,7 +65,12 @@ class RecipeAdmin(admin.ModelAdmin):
         return obj.text[:100]
 
     def count_favorite(self, obj):
-        return obj.favorites.select_related('user').count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if any(formset.has_changed() for formset in formsets):
+            Recipe.objects.filter(pk=form.instance.pk).mark_similar_stale()
 
 
 @admin.register(IngredientsRecipe)
@@ -78,6 +86,28 @@ class IngredientsRecipeAdmin(admin.ModelAdmin):
         'ingredient',
     )
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        recipes = Recipe.objects.filter(pk=obj.recipe_id)
+        recipes.touch()
+        recipes.mark_similar_stale()
+        bump_version_on_commit('recipes')
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        recipes = Recipe.objects.filter(pk=obj.recipe_id)
+        recipes.touch()
+        recipes.mark_similar_stale()
+        bump_version_on_commit('recipes')
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        recipes = Recipe.objects.filter(pk__in=recipe_ids)
+        recipes.touch()
+        recipes.mark_similar_stale()
+        bump_version_on_commit('recipes')
+
 
 @admin.register(ShoppingList)
 class ShoppingListAdmin(admin.ModelAdmin):
@@ -103,3 +133,45 @@ class FavoriteAdmin(admin.ModelAdmin):
     search_fields = (
         'user',
     )
+
+
+@admin.register(CartIngredientTotal)
+class CartIngredientTotalAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'user',
+        'ingredient',
+        'total_amount',
+    )
+
+    search_fields = (
+        'user',
+    )
+
+
+@admin.register(FeedEntry)
+class FeedEntryAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'user',
+        'recipe',
+        'author',
+    )
+
+    search_fields = (
+        'user',
+    )
+
+
+@admin.register(SimilarRecipe)
+class SimilarRecipeAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'recipe',
+        'other',
+        'score',
+    )
+
+    search_fields = (
+        'recipe__name',
+    )
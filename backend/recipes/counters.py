@@ -0,0 +1,55 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipe, ShoppingList
+from users.models import Follow
+
+
+def change_counter(model, pk, field, delta):
+    change_counters(model, (pk,), field, delta)
+
+
+def change_counters(model, pks, field, delta):
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def count_related(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0
+    )
+
+
+def reconcile_recipe_counters(queryset):
+    return queryset.update(
+        favorites_count=count_related(Favorite, 'recipe'),
+        in_carts_count=count_related(ShoppingList, 'recipe'),
+    )
+
+
+def reconcile_user_counters(queryset):
+    return queryset.update(
+        recipes_count=count_related(Recipe, 'author'),
+        followers_count=count_related(Follow, 'author'),
+    )
+
+
+def batches(queryset, batch_size):
+    last_pk = None
+    queryset = queryset.order_by('pk')
+    while True:
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        yield queryset.filter(pk__lte=pks[-1])
+        last_pk = pks[-1]
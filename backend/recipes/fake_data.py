@@ -0,0 +1,273 @@
+import csv
+import io
+import random
+from bisect import bisect_left
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Max
+from PIL import Image
+
+from recipes.counters import (batches, reconcile_recipe_counters,
+                              reconcile_user_counters)
+from recipes.feed import backfill_feeds
+from recipes.images import build_image_variants
+from recipes.models import (CartIngredientTotal, Favorite, Ingredient,
+                            IngredientsRecipe, Recipe, ShoppingList, Tag)
+from users.models import Follow
+
+UserModel = get_user_model()
+
+FAKE_USERNAME_PREFIX = 'fake_user'
+FAKE_PASSWORD = 'fake-password'
+PLACEHOLDER_IMAGE = 'recipe_img/placeholder.png'
+
+FAKE_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F2C94C', 'dessert'),
+    ('Выпечка', '#B0683B', 'bakery'),
+)
+
+DISHES = ('Суп', 'Салат', 'Пирог', 'Омлет', 'Рагу', 'Паста', 'Каша',
+          'Запеканка', 'Блины', 'Плов', 'Котлеты', 'Смузи')
+ADJECTIVES = ('домашний', 'быстрый', 'летний', 'пряный', 'сытный',
+              'лёгкий', 'бабушкин', 'праздничный', 'острый', 'нежный')
+
+
+def zipf_cum_weights(size, exponent):
+    total = 0.0
+    cum_weights = []
+    for rank in range(1, size + 1):
+        total += 1 / rank ** exponent
+        cum_weights.append(total)
+    return cum_weights
+
+
+def get_placeholder_image():
+    if not default_storage.exists(PLACEHOLDER_IMAGE):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 800), (236, 156, 86)).save(buffer, 'PNG')
+        default_storage.save(PLACEHOLDER_IMAGE, ContentFile(buffer.getvalue()))
+    image = Recipe(image=PLACEHOLDER_IMAGE).image
+    return image.name, build_image_variants(image)
+
+
+def copy_objects(model, objects):
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for obj in objects:
+        row = []
+        for field in fields:
+            value = field.get_db_prep_save(
+                getattr(obj, field.attname),
+                connection
+            )
+            row.append(r'\N' if value is None else value)
+        writer.writerow(row)
+    buffer.seek(0)
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE fake_data_import ON COMMIT DROP AS '
+            f'SELECT {columns} FROM {table} WITH NO DATA'
+        )
+        cursor.copy_expert(
+            f'COPY fake_data_import ({columns}) '
+            f"FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) '
+            f'SELECT {columns} FROM fake_data_import '
+            'ON CONFLICT DO NOTHING'
+        )
+
+
+class Popularity:
+
+    def __init__(self, items, exponent, rng):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = zipf_cum_weights(len(self.items), exponent)
+        self.random = rng
+
+    def __len__(self):
+        return len(self.items)
+
+    def choice(self):
+        point = self.random.random() * self.cum_weights[-1]
+        return self.items[bisect_left(self.cum_weights, point)]
+
+    def sample(self, k, exclude=None):
+        k = min(k, len(self.items) - (exclude is not None))
+        picked = set()
+        for _ in range(k * 4):
+            if len(picked) >= k:
+                break
+            item = self.choice()
+            if item != exclude:
+                picked.add(item)
+        return picked
+
+
+class FakeDataGenerator:
+
+    def __init__(self, seed=0, batch_size=1000, exponent=1.1,
+                 use_copy=False, log=None):
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.exponent = exponent
+        self.use_copy = use_copy and connection.vendor == 'postgresql'
+        self.log = log or (lambda message: None)
+
+    def write(self, model, objects):
+        total = 0
+        objects = iter(objects)
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                return total
+            if self.use_copy:
+                with transaction.atomic():
+                    copy_objects(model, batch)
+            else:
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+
+    def heavy_tail(self, mean, limit):
+        return min(limit, int(self.random.paretovariate(1.5) * mean / 3))
+
+    def generate(self, users, recipes, follows=10, favorites=15, carts=4):
+        tag_ids = self.create_tags()
+        ingredients = Popularity(
+            Ingredient.objects.values_list('pk', flat=True),
+            self.exponent,
+            self.random
+        )
+        if not ingredients:
+            raise ValueError('Каталог ингредиентов пуст.')
+
+        user_ids = self.create_users(users)
+        authors = Popularity(user_ids, self.exponent, self.random)
+        recipe_ids = self.create_recipes(recipes, authors)
+        popular_recipes = Popularity(recipe_ids, self.exponent, self.random)
+
+        self.log('Теги и ингредиенты рецептов')
+        self.write(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.random.sample(
+                tag_ids, self.random.randint(1, min(3, len(tag_ids)))
+            )
+        ))
+        self.write(IngredientsRecipe, (
+            IngredientsRecipe(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.random.randint(1, 300)
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in ingredients.sample(
+                self.random.randint(3, 12)
+            )
+        ))
+
+        self.log('Подписки, избранное и списки покупок')
+        self.write(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in authors.sample(
+                self.heavy_tail(follows, len(authors)),
+                exclude=user_id
+            )
+        ))
+        for model, mean in ((Favorite, favorites), (ShoppingList, carts)):
+            self.write(model, (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in popular_recipes.sample(
+                    self.heavy_tail(mean, len(popular_recipes))
+                )
+            ))
+
+        self.log('Пересчёт счётчиков и списков покупок')
+        self.reconcile()
+        return {'users': user_ids, 'recipes': recipe_ids}
+
+    def create_tags(self):
+        Tag.objects.bulk_create(
+            (
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in FAKE_TAGS
+            ),
+            ignore_conflicts=True
+        )
+        return list(Tag.objects.values_list('pk', flat=True))
+
+    def create_users(self, count):
+        self.log(f'Пользователи: {count}')
+        last_pk = UserModel.objects.aggregate(last=Max('pk'))['last'] or 0
+        password = make_password(FAKE_PASSWORD)
+        self.write(UserModel, (
+            UserModel(
+                username=f'{FAKE_USERNAME_PREFIX}{number}',
+                email=f'{FAKE_USERNAME_PREFIX}{number}@example.com',
+                first_name='Тестовый',
+                last_name=f'Пользователь {number}',
+                password=password
+            )
+            for number in range(last_pk + 1, last_pk + count + 1)
+        ))
+        return list(UserModel.objects.filter(
+            pk__gt=last_pk,
+            username__startswith=FAKE_USERNAME_PREFIX
+        ).values_list('pk', flat=True))
+
+    def create_recipes(self, count, authors):
+        self.log(f'Рецепты: {count}')
+        last_pk = Recipe.objects.aggregate(last=Max('pk'))['last'] or 0
+        image, image_variants = get_placeholder_image()
+        self.write(Recipe, (
+            Recipe(
+                author_id=authors.choice(),
+                name=(
+                    f'{self.random.choice(DISHES)} '
+                    f'{self.random.choice(ADJECTIVES)} №{number}'
+                ),
+                text=' '.join(self.random.choices(ADJECTIVES, k=30)),
+                cooking_time=self.random.randint(5, 180),
+                image=image,
+                image_variants=image_variants
+            )
+            for number in range(last_pk + 1, last_pk + count + 1)
+        ))
+        return list(Recipe.objects.filter(
+            pk__gt=last_pk
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def reconcile(self):
+        for batch in batches(Recipe.objects.all(), self.batch_size):
+            reconcile_recipe_counters(batch)
+        for batch in batches(UserModel.objects.all(), self.batch_size):
+            reconcile_user_counters(batch)
+        CartIngredientTotal.objects.rebuild(self.batch_size)
+        backfill_feeds(
+            Follow.objects.all(),
+            settings.FEED['BACKFILL_PER_AUTHOR']
+        )
+        Recipe.objects.filter(feed_pending=True).update(feed_pending=False)
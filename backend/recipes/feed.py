@@ -0,0 +1,198 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow
+
+UserModel = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+
+def get_celebrity_threshold():
+    return settings.FEED['CELEBRITY_FOLLOWERS']
+
+
+def get_followers_count(author_id):
+    return UserModel.objects.filter(
+        pk=author_id
+    ).values_list('followers_count', flat=True).first() or 0
+
+
+def add_entries(entries):
+    FeedEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.FEED['BATCH_SIZE'],
+        ignore_conflicts=True
+    )
+
+
+def fan_out_recipe(recipe_id, author_id):
+    total = 0
+    if get_followers_count(author_id) < get_celebrity_threshold():
+        batch_size = settings.FEED['BATCH_SIZE']
+        followers = Follow.objects.filter(
+            author_id=author_id
+        ).order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(followers.filter(
+                pk__gt=last_pk
+            ).values_list('pk', 'user_id')[:batch_size])
+            if not batch:
+                break
+            add_entries(
+                FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                          author_id=author_id)
+                for _, user_id in batch
+            )
+            total += len(batch)
+            last_pk = batch[-1][0]
+    Recipe.objects.filter(pk=recipe_id).update(feed_pending=False)
+    return total
+
+
+def run_fan_out(recipe_id, author_id):
+    try:
+        fan_out_recipe(recipe_id, author_id)
+    except Exception:
+        logger.exception('Не удалось разослать рецепт %s в ленты', recipe_id)
+
+
+def schedule_fan_out(recipe):
+    recipe_id, author_id = recipe.pk, recipe.author_id
+    transaction.on_commit(lambda: run_fan_out(recipe_id, author_id))
+
+
+def mark_feeds_pending(author_id):
+    UserModel.objects.filter(pk=author_id).update(feed_pending=True)
+
+
+def rebuild_author_feeds(author_id):
+    threshold = get_celebrity_threshold()
+    if get_followers_count(author_id) >= threshold:
+        FeedEntry.objects.filter(author_id=author_id).delete()
+        total, followers = 0, Q(followers_count__gte=threshold)
+    else:
+        total = backfill_feeds(
+            Follow.objects.filter(author_id=author_id),
+            settings.FEED['BACKFILL_PER_AUTHOR']
+        )
+        followers = Q(followers_count__lt=threshold)
+    UserModel.objects.filter(followers, pk=author_id).update(
+        feed_pending=False
+    )
+    return total
+
+
+def fan_out_pending(batch_size):
+    total = 0
+    pending = Recipe.objects.filter(feed_pending=True).order_by('pk')
+    while True:
+        batch = list(pending.values_list('pk', 'author_id')[:batch_size])
+        if not batch:
+            break
+        for recipe_id, author_id in batch:
+            total += fan_out_recipe(recipe_id, author_id)
+
+    authors = UserModel.objects.filter(feed_pending=True).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(authors.filter(
+            pk__gt=last_pk
+        ).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return total
+        for author_id in batch:
+            total += rebuild_author_feeds(author_id)
+        last_pk = batch[-1]
+
+
+def get_author_recipe_ids(author_id):
+    return Recipe.objects.filter(
+        author_id=author_id
+    ).order_by('-pk').values_list('pk', flat=True)[
+        :settings.FEED['BACKFILL_PER_AUTHOR']
+    ]
+
+
+def follow_author(user_id, author_id):
+    followers_count = get_followers_count(author_id)
+    threshold = get_celebrity_threshold()
+    if followers_count == threshold:
+        mark_feeds_pending(author_id)
+    if followers_count >= threshold:
+        return
+    add_entries(
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, author_id=author_id)
+        for recipe_id in get_author_recipe_ids(author_id)
+    )
+
+
+def unfollow_author(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if get_followers_count(author_id) == get_celebrity_threshold() - 1:
+        mark_feeds_pending(author_id)
+
+
+def get_feed_page(user, before, limit):
+    inbox = FeedEntry.objects.filter(user=user)
+    celebrities = Recipe.objects.filter(author_id__in=Follow.objects.filter(
+        Q(author__followers_count__gte=get_celebrity_threshold())
+        | Q(author__feed_pending=True),
+        user=user
+    ).values('author_id'))
+    if before is not None:
+        inbox = inbox.filter(recipe_id__lt=before)
+        celebrities = celebrities.filter(pk__lt=before)
+
+    recipe_ids = sorted(
+        {
+            *inbox.order_by('-recipe_id').values_list(
+                'recipe_id', flat=True
+            )[:limit],
+            *celebrities.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:limit],
+        },
+        reverse=True
+    )[:limit]
+    recipes = Recipe.objects.for_listing().in_bulk(recipe_ids)
+    return [recipes[pk] for pk in recipe_ids if pk in recipes]
+
+
+def backfill_feeds(follows, per_author):
+    threshold = get_celebrity_threshold()
+    follows = follows.filter(
+        author__followers_count__lt=threshold
+    ).values_list('user_id', 'author_id')
+    batch_size = settings.FEED['BATCH_SIZE']
+
+    total = 0
+    pending = []
+    for user_id, author_id in follows.iterator(chunk_size=batch_size):
+        pending.append((user_id, author_id))
+        if len(pending) >= batch_size:
+            total += backfill_batch(pending, per_author)
+            pending = []
+    if pending:
+        total += backfill_batch(pending, per_author)
+    return total
+
+
+def backfill_batch(follows, per_author):
+    author_recipes = Recipe.objects.by_authors(
+        list({author_id for _, author_id in follows}),
+        per_author
+    )
+    entries = [
+        FeedEntry(user_id=user_id, recipe_id=recipe.pk, author_id=author_id)
+        for user_id, author_id in follows
+        for recipe in author_recipes[author_id]
+    ]
+    add_entries(entries)
+    return len(entries)
@@ -0,0 +1,54 @@
+import hashlib
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+IMAGE_VARIANTS_DIR = 'recipe_img/'
+IMAGE_VARIANT_WIDTHS = (300, 600, 1200)
+IMAGE_VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+
+def save_variant(image, pil_format, options, extension):
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    content = buffer.getvalue()
+
+    digest = hashlib.sha256(content).hexdigest()[:20]
+    name = f'{IMAGE_VARIANTS_DIR}{digest}.{extension}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name
+
+
+def build_image_variants(image_field):
+    image_field.open('rb')
+    try:
+        with Image.open(image_field) as original:
+            image = ImageOps.exif_transpose(original).convert('RGB')
+    finally:
+        image_field.close()
+
+    widths = [
+        width for width in IMAGE_VARIANT_WIDTHS if width < image.width
+    ] or [image.width]
+
+    variants = {extension: {} for extension in IMAGE_VARIANT_FORMATS}
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        for extension, (pil_format, options) in IMAGE_VARIANT_FORMATS.items():
+            variants[extension][str(width)] = save_variant(
+                resized, pil_format, options, extension
+            )
+    return variants
+
+
+def iter_variants(variants):
+    for extension, sizes in variants.items():
+        for width, name in sizes.items():
+            yield extension, width, name
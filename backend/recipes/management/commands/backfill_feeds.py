@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.feed import backfill_feeds
+from recipes.models import FeedEntry
+from users.models import Follow
+
+
+class Command(BaseCommand):
+
+    help = ('Заполняет ленты подписок последними рецептами авторов, '
+            'на которых подписаны пользователи')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--per-author',
+            type=int,
+            default=settings.FEED['BACKFILL_PER_AUTHOR'],
+            help='Сколько последних рецептов автора добавить в ленту',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help='Заполнить ленты только указанных пользователей',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить существующие записи лент перед заполнением',
+        )
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.all()
+        entries = FeedEntry.objects.all()
+        if options['users']:
+            follows = follows.filter(user_id__in=options['users'])
+            entries = entries.filter(user_id__in=options['users'])
+        if options['clear']:
+            entries.delete()
+
+        total = backfill_feeds(follows, options['per_author'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано записей лент: {total}.'
+        ))
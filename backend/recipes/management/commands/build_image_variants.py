@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from api.versions import bump_version
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+
+    help = 'Создаёт уменьшенные копии картинок рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать копии и для рецептов, у которых они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only('id', 'image')
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+
+        built = 0
+        for recipe in recipes.iterator():
+            try:
+                recipe.update_image_variants()
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'Рецепт {recipe.id}: {error}')
+                continue
+            built += 1
+        if built:
+            bump_version('recipes')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Уменьшенные копии созданы для рецептов: {built}.'
+        ))
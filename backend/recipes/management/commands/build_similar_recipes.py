@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import build_similar_recipes
+
+
+class Command(BaseCommand):
+
+    help = ('Пересчитывает похожие рецепты по совпадению ингредиентов '
+            '(коэффициент Жаккара)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-only',
+            action='store_true',
+            help='Пересчитать только рецепты, отмеченные как устаревшие',
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            help='Сколько похожих рецептов хранить для каждого рецепта',
+        )
+        parser.add_argument(
+            '--min-score',
+            type=float,
+            help='Минимальное сходство, при котором рецепт считается похожим',
+        )
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            help='Сколько рецептов обрабатывать за один проход',
+        )
+
+    def handle(self, *args, **options):
+        total = build_similar_recipes(
+            stale_only=options['stale_only'],
+            top_k=options['top_k'],
+            min_score=options['min_score'],
+            block_size=options['block_size'],
+            log=self.stdout.write
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Сохранено пар похожих рецептов: {total}.'
+        ))
@@ -0,0 +1,93 @@
+import json
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import IngredientsRecipe, Recipe
+
+
+class Command(BaseCommand):
+
+    help = 'Выгружает рецепты в формате NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Путь к файлу; по умолчанию вывод в stdout',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+        )
+
+    def write_chunk(self, output, recipes):
+        recipe_ids = [recipe.id for recipe in recipes]
+
+        ingredients = defaultdict(list)
+        for recipe_id, name, measurement_unit, amount in (
+            IngredientsRecipe.objects.filter(
+                recipe_id__in=recipe_ids
+            ).order_by('id').values_list(
+                'recipe_id',
+                'ingredient__name',
+                'ingredient__measurement_unit',
+                'amount'
+            )
+        ):
+            ingredients[recipe_id].append({
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount,
+            })
+
+        tags = defaultdict(list)
+        for recipe_id, slug in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'tag__slug'):
+            tags[recipe_id].append(slug)
+
+        for recipe in recipes:
+            output.write(json.dumps({
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'image': recipe.image.name,
+                'author': {
+                    'username': recipe.author.username,
+                    'email': recipe.author.email,
+                },
+                'tags': tags[recipe.id],
+                'ingredients': ingredients[recipe.id],
+            }, ensure_ascii=False))
+            output.write('\n')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        recipes = Recipe.objects.select_related('author').only(
+            'id', 'name', 'text', 'cooking_time', 'image',
+            'author__username', 'author__email'
+        ).order_by('id').iterator(chunk_size=chunk_size)
+
+        output = (
+            open(options['output'], 'w', encoding='utf8')
+            if options['output'] else sys.stdout
+        )
+        total = 0
+        try:
+            chunk = []
+            for recipe in recipes:
+                chunk.append(recipe)
+                if len(chunk) == chunk_size:
+                    self.write_chunk(output, chunk)
+                    total += len(chunk)
+                    chunk = []
+            if chunk:
+                self.write_chunk(output, chunk)
+                total += len(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        self.stderr.write(f'Выгружено рецептов: {total}.')
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.feed import fan_out_pending
+
+
+class Command(BaseCommand):
+
+    help = ('Рассылает в ленты подписчиков рецепты, рассылка которых '
+            'не была завершена, и пересобирает ленты подписчиков авторов, '
+            'перешедших порог популярности')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.FEED['BATCH_SIZE'],
+        )
+
+    def handle(self, *args, **options):
+        total = fan_out_pending(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено записей лент: {total}.'
+        ))
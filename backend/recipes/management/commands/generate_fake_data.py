@@ -0,0 +1,84 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.versions import bump_version
+from recipes.fake_data import FAKE_PASSWORD, FakeDataGenerator
+
+
+class Command(BaseCommand):
+
+    help = ('Создаёт тестовых пользователей, рецепты, подписки, избранное '
+            'и списки покупок для нагрузочного тестирования')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=10,
+            help='Среднее число подписок на пользователя',
+        )
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=15,
+            help='Среднее число рецептов в избранном',
+        )
+        parser.add_argument(
+            '--carts',
+            type=int,
+            default=4,
+            help='Среднее число рецептов в списке покупок',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--exponent',
+            type=float,
+            default=1.1,
+            help='Показатель степенного распределения популярности',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY на PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        generator = FakeDataGenerator(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            exponent=options['exponent'],
+            use_copy=use_copy,
+            log=self.stdout.write
+        )
+
+        started = time.monotonic()
+        try:
+            created = generator.generate(
+                users=options['users'],
+                recipes=options['recipes'],
+                follows=options['follows'],
+                favorites=options['favorites'],
+                carts=options['carts']
+            )
+        except ValueError as error:
+            raise CommandError(
+                f'{error} Сначала выполните load_ingredients.'
+            )
+        bump_version('catalog')
+        bump_version('recipes')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(created["users"])}, '
+            f'рецептов: {len(created["recipes"])} '
+            f'за {time.monotonic() - started:.1f} с '
+            f'({"COPY" if use_copy else "bulk_create"}). '
+            f'Пароль пользователей: {FAKE_PASSWORD}.'
+        ))
@@ -0,0 +1,194 @@
+import json
+import sys
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.versions import bump_version
+from recipes.counters import reconcile_user_counters
+from recipes.models import Ingredient, IngredientsRecipe, Recipe, Tag
+
+UserModel = get_user_model()
+
+
+class Command(BaseCommand):
+
+    help = 'Загружает рецепты из файла NDJSON, созданного export_recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Путь к файлу; "-" для чтения из stdin',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+        )
+        parser.add_argument(
+            '--create-authors',
+            action='store_true',
+            help='Создавать отсутствующих авторов без пароля',
+        )
+
+    def get_authors(self, records, create):
+        authors = {
+            record['author']['username']: record['author']
+            for record in records
+        }
+        users = UserModel.objects.in_bulk(authors, field_name='username')
+        missing = authors.keys() - users.keys()
+        if missing and create:
+            new_users = [
+                UserModel(
+                    username=username,
+                    email=authors[username]['email']
+                )
+                for username in missing
+            ]
+            for user in new_users:
+                user.set_unusable_password()
+            UserModel.objects.bulk_create(new_users, ignore_conflicts=True)
+            users = UserModel.objects.in_bulk(authors, field_name='username')
+        return users
+
+    def get_ingredients(self, records):
+        keys = {
+            (ingredient['name'], ingredient['measurement_unit'])
+            for record in records
+            for ingredient in record['ingredients']
+        }
+        names = {name for name, _ in keys}
+
+        def fetch():
+            return {
+                (ingredient.name, ingredient.measurement_unit): ingredient.id
+                for ingredient in Ingredient.objects.filter(name__in=names)
+            }
+
+        ingredients = fetch()
+        missing = keys - ingredients.keys()
+        if missing:
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in missing
+                ),
+                ignore_conflicts=True
+            )
+            created = len(ingredients)
+            ingredients = fetch()
+            self.created_ingredients += len(ingredients) - created
+        return ingredients
+
+    def import_chunk(self, records, create_authors):
+        authors = self.get_authors(records, create_authors)
+        records = [
+            record for record in records
+            if record['author']['username'] in authors
+        ]
+        for record in records:
+            record['author_id'] = authors[record['author']['username']].id
+
+        existing = set(Recipe.objects.filter(
+            author_id__in={record['author_id'] for record in records},
+            name__in={record['name'] for record in records}
+        ).values_list('author_id', 'name'))
+        records = [
+            record for record in records
+            if (record['author_id'], record['name']) not in existing
+        ]
+        if not records:
+            return 0
+
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author_id=record['author_id'],
+                    name=record['name'],
+                    text=record['text'],
+                    cooking_time=record['cooking_time'],
+                    image=record['image'],
+                )
+                for record in records
+            ),
+            ignore_conflicts=True
+        )
+        recipe_ids = {
+            (author_id, name): pk
+            for pk, author_id, name in Recipe.objects.filter(
+                author_id__in={record['author_id'] for record in records},
+                name__in={record['name'] for record in records}
+            ).values_list('id', 'author_id', 'name')
+        }
+
+        ingredients = self.get_ingredients(records)
+        tags = Tag.objects.in_bulk(
+            {slug for record in records for slug in record['tags']},
+            field_name='slug'
+        )
+        TagsRecipe = Recipe.tags.through
+        amounts, recipe_tags = [], []
+        for record in records:
+            recipe_id = recipe_ids[(record['author_id'], record['name'])]
+            amounts.extend(
+                IngredientsRecipe(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredients[(
+                        ingredient['name'],
+                        ingredient['measurement_unit']
+                    )],
+                    amount=ingredient['amount']
+                )
+                for ingredient in record['ingredients']
+            )
+            recipe_tags.extend(
+                TagsRecipe(recipe_id=recipe_id, tag_id=tags[slug].id)
+                for slug in record['tags'] if slug in tags
+            )
+
+        IngredientsRecipe.objects.bulk_create(amounts, ignore_conflicts=True)
+        TagsRecipe.objects.bulk_create(recipe_tags, ignore_conflicts=True)
+        reconcile_user_counters(UserModel.objects.filter(
+            pk__in={record['author_id'] for record in records}
+        ))
+        return len(records)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        source = (
+            sys.stdin if path == '-' else open(path, encoding='utf8')
+        )
+
+        read = imported = self.created_ingredients = 0
+        try:
+            lines = (line for line in source if line.strip())
+            while True:
+                chunk = list(islice(lines, options['chunk_size']))
+                if not chunk:
+                    break
+                try:
+                    records = [json.loads(line) for line in chunk]
+                except json.JSONDecodeError as error:
+                    raise CommandError(
+                        f'Некорректная строка после записи {read}: {error}'
+                    )
+                with transaction.atomic():
+                    imported += self.import_chunk(
+                        records, options['create_authors']
+                    )
+                read += len(records)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if imported:
+                bump_version('recipes')
+            if self.created_ingredients:
+                bump_version('ingredients')
+                bump_version('catalog')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано записей: {read}, добавлено рецептов: {imported}.'
+        ))
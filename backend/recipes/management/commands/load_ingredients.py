@@ -0,0 +1,142 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.versions import bump_version
+from recipes.models import Ingredient
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(file):
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Файл JSON должен содержать массив.')
+    buffer = buffer[1:]
+
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,')
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as error:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError(f'Некорректный JSON: {error}')
+            buffer += chunk
+            continue
+        yield item['name'], item['measurement_unit']
+        buffer = buffer[end:]
+
+
+def iter_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+def insert_batch(batch):
+    Ingredient.objects.bulk_create(
+        (
+            Ingredient(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in batch
+        ),
+        ignore_conflicts=True
+    )
+
+
+def copy_batch(batch):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    buffer.seek(0)
+
+    table = Ingredient._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE ingredient_import '
+            '(name varchar(100), measurement_unit varchar(50)) '
+            'ON COMMIT DROP'
+        )
+        cursor.copy_expert(
+            'COPY ingredient_import (name, measurement_unit) '
+            'FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+        cursor.execute(
+            f'INSERT INTO {table} (name, measurement_unit) '
+            'SELECT DISTINCT name, measurement_unit FROM ingredient_import '
+            'ON CONFLICT (name, measurement_unit) DO NOTHING'
+        )
+
+
+class Command(BaseCommand):
+
+    help = 'Загружает ингредиенты из файла JSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='data/ingredients.json',
+        )
+        parser.add_argument(
+            '--format',
+            choices=('json', 'csv'),
+            help='Формат файла; по умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY на PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in ('json', 'csv'):
+            raise CommandError(f'Неизвестный формат файла: {path}')
+
+        use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        write_batch = copy_batch if use_copy else insert_batch
+        read_rows = iter_json_array if file_format == 'json' else iter_csv
+
+        started = time.monotonic()
+        count_before = Ingredient.objects.count()
+        total = 0
+        with path.open(encoding='utf8', newline='') as file:
+            rows = (
+                (name.strip(), measurement_unit.strip())
+                for name, measurement_unit in read_rows(file)
+            )
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    write_batch(batch)
+                total += len(batch)
+
+        bump_version('ingredients')
+        bump_version('catalog')
+
+        elapsed = time.monotonic() - started
+        created = Ingredient.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {total}, добавлено ингредиентов: {created} '
+            f'за {elapsed:.2f} с ({total / max(elapsed, 1e-6):.0f} строк/с).'
+        ))
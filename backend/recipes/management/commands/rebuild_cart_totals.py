@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import CartIngredientTotal
+
+
+class Command(BaseCommand):
+
+    help = 'Пересчитывает итоги списков покупок по таблице ShoppingList'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            CartIngredientTotal.objects.rebuild(
+                batch_size=options['batch_size']
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Итоги списков покупок пересчитаны. Количество записей: '
+            f'{CartIngredientTotal.objects.count()}.'
+        ))
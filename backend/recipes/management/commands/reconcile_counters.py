@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipes.counters import (batches, reconcile_recipe_counters,
+                              reconcile_user_counters)
+from recipes.models import Recipe
+
+UserModel = get_user_model()
+
+
+class Command(BaseCommand):
+
+    help = ('Пересчитывает счётчики избранного, списков покупок, '
+            'рецептов и подписчиков')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        recipes = sum(
+            reconcile_recipe_counters(batch)
+            for batch in batches(Recipe.objects.all(), batch_size)
+        )
+        users = sum(
+            reconcile_user_counters(batch)
+            for batch in batches(UserModel.objects.all(), batch_size)
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны. Рецептов: {recipes}, '
+            f'пользователей: {users}.'
+        ))
@@ -0,0 +1,63 @@
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def merge_rows(model, owner_field, amount_field, keep_id, duplicate_id):
+    kept = dict(
+        model.objects.filter(
+            ingredient_id=keep_id
+        ).values_list(owner_field, 'id')
+    )
+    for row in model.objects.filter(ingredient_id=duplicate_id):
+        owner_id = getattr(row, owner_field)
+        if owner_id in kept:
+            model.objects.filter(pk=kept[owner_id]).update(
+                **{amount_field: F(amount_field) + getattr(row, amount_field)}
+            )
+            row.delete()
+        else:
+            row.ingredient_id = keep_id
+            row.save(update_fields=('ingredient',))
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientsRecipe = apps.get_model('recipes', 'IngredientsRecipe')
+    CartIngredientTotal = apps.get_model('recipes', 'CartIngredientTotal')
+
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=Min('id'),
+        total=Count('id')
+    ).filter(total__gt=1).order_by()
+
+    for group in duplicates:
+        duplicate_ids = Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit']
+        ).exclude(pk=group['keep_id']).values_list('pk', flat=True)
+        for duplicate_id in duplicate_ids:
+            merge_rows(IngredientsRecipe, 'recipe_id', 'amount',
+                       group['keep_id'], duplicate_id)
+            merge_rows(CartIngredientTotal, 'user_id', 'total_amount',
+                       group['keep_id'], duplicate_id)
+        Ingredient.objects.filter(pk__in=list(duplicate_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients,
+            migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_unit'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='feed_pending',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Ожидает рассылки в ленты'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='feed_pending',
+            field=models.BooleanField(db_index=True, default=True, editable=False, verbose_name='Ожидает рассылки в ленты'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+from recipes.operations import PostgreSQLAddIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_feed_pending'),
+    ]
+
+    operations = [
+        PostgreSQLAddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['image_variants'], name='recipe_image_variants_idx', opclasses=('jsonb_path_ops',)),
+        ),
+    ]
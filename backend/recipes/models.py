@@ -1,9 +1,26 @@
+import logging
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.files.storage import default_storage
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import (Case, F, IntegerField, Prefetch, Q, Sum,
+                              TextField, Value, When, Window,
+                              prefetch_related_objects)
+from django.db.models.functions import Cast, RowNumber
+
+from api.versions import bump_version_on_commit
+from recipes.images import build_image_variants, iter_variants
 
 UserModel = get_user_model()
 
+logger = logging.getLogger(__name__)
+
 
 class Tag(models.Model):
 
@@ -50,11 +67,72 @@ class Ingredient(models.Model):
         ordering = ['name']
         verbose_name = 'Ингридиент'
         verbose_name_plural = 'Ингридиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient_name_unit'
+            )
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def for_listing(self):
+        return self.defer('search_vector').select_related('author')
+
+    def touch(self):
+        return self.update(version=F('version') + 1)
+
+    def with_image_variants(self, variants):
+        if connection.vendor == 'postgresql':
+            return self.filter(reduce(or_, (
+                Q(image_variants__contains={extension: {width: name}})
+                for extension, width, name in variants
+            )))
+        return self.annotate(
+            image_variants_text=Cast('image_variants', TextField())
+        ).filter(reduce(or_, (
+            Q(image_variants_text__contains=name)
+            for _, _, name in variants
+        )))
+
+    def mark_similar_stale(self):
+        recipe_ids = self.values('pk')
+        return Recipe.objects.filter(
+            Q(pk__in=recipe_ids)
+            | Q(pk__in=SimilarRecipe.objects.filter(
+                other__in=recipe_ids
+            ).values('recipe'))
+        ).update(similar_stale=True, version=F('version') + 1)
+
+    def by_authors(self, author_ids, limit=None):
+        recipes = defaultdict(list)
+        if not author_ids:
+            return recipes
+
+        queryset = self.filter(author_id__in=author_ids)
+        if limit is not None:
+            sql, params = queryset.annotate(
+                recipe_rank=Window(
+                    expression=RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=F('id').desc()
+                )
+            ).query.sql_with_params()
+            queryset = self.raw(
+                f'SELECT * FROM ({sql}) ranked_recipes '
+                'WHERE recipe_rank <= %s ORDER BY recipe_rank',
+                (*params, limit)
+            )
+
+        for recipe in queryset:
+            recipes[recipe.author_id].append(recipe)
+        return recipes
+
+
 class Recipe(models.Model):
 
     author = models.ForeignKey(
@@ -81,6 +159,13 @@ class Recipe(models.Model):
         upload_to='recipe_img/',
     )
 
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии картинки',
+        default=dict,
+        blank=True,
+        editable=False
+    )
+
     name = models.CharField(
         verbose_name='Название',
         max_length=200
@@ -98,6 +183,46 @@ class Recipe(models.Model):
         )
     )
 
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в списки покупок',
+        default=0,
+        editable=False
+    )
+
+    version = models.PositiveIntegerField(
+        verbose_name='Версия',
+        default=1,
+        editable=False
+    )
+
+    similar_stale = models.BooleanField(
+        verbose_name='Похожие рецепты требуют пересчёта',
+        default=True,
+        db_index=True,
+        editable=False
+    )
+
+    feed_pending = models.BooleanField(
+        verbose_name='Ожидает рассылки в ленты',
+        default=True,
+        db_index=True,
+        editable=False
+    )
+
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         ordering = ['-id']
         verbose_name = 'Рецепт'
@@ -108,10 +233,80 @@ class Recipe(models.Model):
                 name='unique_author_name'
             )
         ]
+        indexes = [
+            GinIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_idx'
+            ),
+            GinIndex(
+                fields=('image_variants',),
+                name='recipe_image_variants_idx',
+                opclasses=('jsonb_path_ops',)
+            )
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        image_uploaded = bool(self.image) and not self.image._committed
+        changed = not self._state.adding
+        if changed:
+            self.version = F('version') + 1
+        if image_uploaded:
+            superseded = self.image_variants
+            self.image_variants = {}
+        super().save(*args, **kwargs)
+        if changed:
+            self.refresh_from_db(fields=('version',))
+        if image_uploaded:
+            recipe_id = self.pk
+            transaction.on_commit(
+                lambda: build_recipe_variants(recipe_id, superseded)
+            )
+
+    def update_image_variants(self, superseded=None):
+        if superseded is None:
+            superseded = self.image_variants
+        self.image_variants = build_image_variants(self.image)
+        Recipe.objects.filter(pk=self.pk).update(
+            image_variants=self.image_variants,
+            version=F('version') + 1
+        )
+        self.refresh_from_db(fields=('version',))
+        bump_version_on_commit('recipes')
+        self.delete_unused_variants(superseded)
+
+    def delete_unused_variants(self, superseded):
+        current = {name for _, _, name in iter_variants(self.image_variants)}
+        unused = [
+            variant for variant in iter_variants(superseded)
+            if variant[2] not in current
+        ]
+        if not unused:
+            return
+        for variants in Recipe.objects.with_image_variants(
+            unused
+        ).order_by().values_list('image_variants', flat=True):
+            current.update(name for _, _, name in iter_variants(variants))
+        for _, _, name in unused:
+            if name not in current:
+                default_storage.delete(name)
+
+
+def build_recipe_variants(recipe_id, superseded):
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'id', 'image', 'image_variants'
+    ).first()
+    if recipe is None:
+        return
+    try:
+        recipe.update_image_variants(superseded)
+    except (OSError, ValueError):
+        logger.exception(
+            'Не удалось создать копии картинки рецепта %s', recipe_id
+        )
+
 
 class IngredientsRecipe(models.Model):
 
@@ -153,6 +348,17 @@ class IngredientsRecipe(models.Model):
         return self.ingredient.name
 
 
+def prefetch_recipe_details(recipes):
+    prefetch_related_objects(
+        recipes,
+        Prefetch(
+            'amount',
+            queryset=IngredientsRecipe.objects.select_related('ingredient')
+        ),
+        'tags'
+    )
+
+
 class ShoppingList(models.Model):
 
     user = models.ForeignKey(
@@ -215,3 +421,219 @@ class Favorite(models.Model):
     def __str__(self):
         return (f'Список "Избранное" пользователя {self.user_id} содержит '
                 f'следующие рецепты: {self.recipe_id}.')
+
+
+class CartIngredientTotalManager(models.Manager):
+
+    def recipe_amounts(self, recipe_ids):
+        return dict(
+            IngredientsRecipe.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values_list(
+                'ingredient_id'
+            ).annotate(
+                total_amount=Sum('amount')
+            ).order_by()
+        )
+
+    def add_recipes(self, user, recipe_ids):
+        self.apply_deltas([user.id], self.recipe_amounts(recipe_ids))
+
+    def remove_recipes(self, user, recipe_ids):
+        self.apply_deltas([user.id], {
+            ingredient_id: -amount
+            for ingredient_id, amount
+            in self.recipe_amounts(recipe_ids).items()
+        })
+
+    def discard_recipe(self, recipe):
+        self.change_recipe(recipe, {
+            ingredient_id: -amount
+            for ingredient_id, amount
+            in self.recipe_amounts((recipe.id,)).items()
+        })
+
+    def change_recipe(self, recipe, deltas):
+        user_ids = ShoppingList.objects.filter(
+            recipe=recipe
+        ).values_list('user_id', flat=True)
+        self.apply_deltas(list(user_ids), deltas)
+
+    def apply_deltas(self, user_ids, deltas):
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        if not user_ids or not deltas:
+            return
+
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=0
+                )
+                for user_id in user_ids
+                for ingredient_id, delta in deltas.items() if delta > 0
+            ),
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        totals = self.filter(
+            user_id__in=user_ids,
+            ingredient_id__in=deltas
+        )
+        totals.update(total_amount=F('total_amount') + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in deltas.items()
+            ),
+            default=Value(0),
+            output_field=IntegerField()
+        ))
+        totals.filter(total_amount__lte=0).delete()
+
+    def rebuild(self, batch_size=1000):
+        self.all().delete()
+        rows = IngredientsRecipe.objects.filter(
+            recipe__cart__isnull=False
+        ).values_list(
+            'recipe__cart__user',
+            'ingredient'
+        ).annotate(
+            total_amount=Sum('amount')
+        ).order_by()
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=total_amount
+                )
+                for user_id, ingredient_id, total_amount
+                in rows.iterator()
+            ),
+            batch_size=batch_size
+        )
+
+
+class CartIngredientTotal(models.Model):
+
+    user = models.ForeignKey(
+        UserModel,
+        on_delete=models.CASCADE,
+        related_name='cart_totals',
+        verbose_name='Составитель списка покупок'
+    )
+
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='cart_totals',
+        verbose_name='Ингредиент'
+    )
+
+    total_amount = models.IntegerField(
+        verbose_name='Общее количество'
+    )
+
+    objects = CartIngredientTotalManager()
+
+    class Meta:
+        verbose_name = 'Итог списка покупок'
+        verbose_name_plural = 'Итоги списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_cart_total_user_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return (f'{self.ingredient_id} в списке покупок пользователя '
+                f'{self.user_id}: {self.total_amount}')
+
+
+class FeedEntry(models.Model):
+
+    user = models.ForeignKey(
+        UserModel,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Получатель'
+    )
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+
+    author = models.ForeignKey(
+        UserModel,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry_user_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_entry_user_author_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} в ленте пользователя {self.user_id}'
+
+
+class SimilarRecipe(models.Model):
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='Рецепт'
+    )
+
+    other = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+
+    score = models.FloatField(
+        verbose_name='Сходство'
+    )
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'other'),
+                name='unique_similar_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe', '-score'),
+                name='similar_recipe_score_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} похож на {self.other_id}: {self.score:.2f}'
@@ -0,0 +1,115 @@
+from functools import reduce
+from operator import or_
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from scipy import sparse
+
+from recipes.counters import batches
+from recipes.models import IngredientsRecipe, Recipe, SimilarRecipe
+
+
+def load_matrix(chunk_size):
+    pairs = IngredientsRecipe.objects.order_by().values_list(
+        'recipe_id', 'ingredient_id'
+    )
+    recipe_column, ingredient_column = [], []
+    for recipe_id, ingredient_id in pairs.iterator(chunk_size=chunk_size):
+        recipe_column.append(recipe_id)
+        ingredient_column.append(ingredient_id)
+
+    recipe_ids, rows = np.unique(
+        np.array(recipe_column, dtype=np.int64), return_inverse=True
+    )
+    ingredient_ids, columns = np.unique(
+        np.array(ingredient_column, dtype=np.int64), return_inverse=True
+    )
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+        shape=(len(recipe_ids), len(ingredient_ids))
+    )
+    return recipe_ids, matrix
+
+
+def top_neighbours(matrix, sizes, rows, top_k, min_score):
+    overlaps = (matrix[rows] @ matrix.T).tocsr()
+    for position, row in enumerate(rows):
+        start, end = overlaps.indptr[position], overlaps.indptr[position + 1]
+        others = overlaps.indices[start:end]
+        shared = overlaps.data[start:end]
+        scores = shared / (sizes[row] + sizes[others] - shared)
+
+        keep = (others != row) & (scores >= min_score)
+        others, scores = others[keep], scores[keep]
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+            others, scores = others[best], scores[best]
+        yield row, others, scores
+
+
+def get_targets(stale_only, block_size):
+    targets = Recipe.objects.all()
+    if stale_only:
+        targets = targets.filter(similar_stale=True)
+
+    versions = {}
+    for batch in batches(targets, block_size):
+        versions.update(batch.values_list('pk', 'version'))
+    return versions
+
+
+def save_neighbours(block, versions, neighbours):
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=block).delete()
+        SimilarRecipe.objects.bulk_create(
+            neighbours,
+            batch_size=settings.SIMILAR_RECIPES['BLOCK_SIZE']
+        )
+        Recipe.objects.filter(reduce(or_, (
+            Q(pk=pk, version=versions[pk]) for pk in block
+        ))).update(similar_stale=False)
+
+
+def build_similar_recipes(stale_only=False, top_k=None, min_score=None,
+                          block_size=None, log=None):
+    config = settings.SIMILAR_RECIPES
+    top_k = top_k or config['TOP_K']
+    min_score = config['MIN_SCORE'] if min_score is None else min_score
+    block_size = block_size or config['BLOCK_SIZE']
+    log = log or (lambda message: None)
+
+    versions = get_targets(stale_only, block_size)
+    if not versions:
+        return 0
+    target_ids = list(versions)
+    recipe_ids, matrix = load_matrix(block_size * 10)
+    sizes = np.asarray(matrix.sum(axis=1)).ravel()
+    log(f'Рецептов с ингредиентами: {len(recipe_ids)}, '
+        f'к пересчёту: {len(target_ids)}')
+
+    total = 0
+    for start in range(0, len(target_ids), block_size):
+        block = target_ids[start:start + block_size]
+        positions = np.searchsorted(recipe_ids, block)
+        rows = [
+            position for position, recipe_id in zip(positions, block)
+            if position < len(recipe_ids)
+            and recipe_ids[position] == recipe_id
+        ]
+        neighbours = [
+            SimilarRecipe(
+                recipe_id=int(recipe_ids[row]),
+                other_id=int(recipe_ids[other]),
+                score=float(score)
+            )
+            for row, others, scores in top_neighbours(
+                matrix, sizes, rows, top_k, min_score
+            )
+            for other, score in zip(others, scores)
+        ]
+        save_neighbours(block, versions, neighbours)
+        total += len(neighbours)
+        log(f'Обработано рецептов: {start + len(block)}')
+    return total
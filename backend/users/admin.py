@@ -15,6 +15,8 @@ class UserModelAdmin(admin.ModelAdmin):
         'first_name',
         'last_name',
         'email',
+        'recipes_count',
+        'followers_count',
     )
 
     search_fields = (
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_usermodel_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='feed_pending',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Ленты подписчиков ожидают пересборки'),
+        ),
+    ]
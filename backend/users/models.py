@@ -33,6 +33,25 @@ class UserModel(AbstractUser):
         blank=True
     )
 
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False
+    )
+
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False
+    )
+
+    feed_pending = models.BooleanField(
+        verbose_name='Ленты подписчиков ожидают пересборки',
+        default=False,
+        db_index=True,
+        editable=False
+    )
+
     class Meta:
         ordering = ['username']
         verbose_name = 'Пользователь'